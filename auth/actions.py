@@ -1,48 +1,104 @@
+import functools
 from datetime import datetime, timedelta, timezone
 from typing import Annotated, Optional
 
 import sentry_sdk
-from fastapi import Depends, HTTPException, Request, Query
-from jose import jwt, JWTError
+from fastapi import HTTPException, Request, Query
+import jwt
+import orjson
+from jwt import InvalidTokenError, DecodeError
 
-from nng_sdk.one_password.op_connect import OpConnect
 from nng_sdk.postgres.exceptions import ItemNotFoundException
-from nng_sdk.postgres.nng_postgres import NngPostgres
 
+from auth.models import AuthCredentials
+from dependencies import get_postgres
 from utils.environment_helper import EnvironmentHelper
-
-op = OpConnect()
-
-postgres = NngPostgres()
+from utils.ttl_cache import TtlCache
 
 allowed_services = ["watchdog", "bot"]
 
 ALGORITHM = "HS256"
 
+SERVICE_TOKEN_CACHE_TTL = 60
+# только успешно проверенные сервисные токены, неудачи не кешируются
+service_tokens_cache = TtlCache(ttl=SERVICE_TOKEN_CACHE_TTL, maxsize=4096)
+
+
+class _OrjsonJWT(jwt.PyJWT):
+    def _decode_payload(self, decoded: dict) -> dict:
+        try:
+            payload = orjson.loads(decoded["payload"])
+        except orjson.JSONDecodeError as e:
+            raise DecodeError(f"Invalid payload string: {e}")
+
+        if not isinstance(payload, dict):
+            raise DecodeError("Invalid payload string: must be a json object")
+
+        return payload
+
+
+_jwt = _OrjsonJWT()
+
+
+@functools.lru_cache(maxsize=1)
+def _get_keys() -> AuthCredentials:
+    return EnvironmentHelper.get_auth_keys()
+
+
+def _decode(token: str | None) -> dict | None:
+    if not token:
+        return None
+
+    try:
+        return _jwt.decode(token, _get_keys().secret_key, algorithms=[ALGORITHM])
+    except InvalidTokenError:
+        return None
+
 
 def get_bearer_token(request: Request) -> str | None:
     auth = request.headers.get("Authorization")
     if not auth:
         return None
 
-    return auth.split(" ")[1]
+    scheme, sep, token = auth.partition(" ")
+    return token if sep and scheme.lower() == "bearer" else None
+
+
+def get_token_claims(request: Request) -> dict | None:
+    # токен декодируется один раз за запрос, дальше берем из request.state
+    if not hasattr(request.state, "jwt_claims"):
+        request.state.jwt_claims = _decode(get_bearer_token(request))
+
+    return request.state.jwt_claims
+
+
+def _check_service_token(request: Request) -> bool:
+    token = get_bearer_token(request)
+    if not token:
+        return False
+
+    if service_tokens_cache.get(token):
+        return True
+
+    if not _check_service_claims(get_token_claims(request)):
+        return False
+
+    service_tokens_cache.set(token, True)
+    return True
 
 
 def verify_credential(credential: str):
-    keys = EnvironmentHelper.get_auth_keys()
-    return credential == keys.auth_key
+    return credential == _get_keys().auth_key
 
 
-def ensure_authorization(
-    token: Annotated[Optional[str], Depends(get_bearer_token)],
-):
+def ensure_authorization(request: Request):
     credentials_exception = HTTPException(
         status_code=401,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    if check_jwt_auth(token):
+    if _check_service_token(request):
         return True
 
     raise credentials_exception
@@ -57,16 +113,20 @@ def ensure_user_authorization(
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+    if _check_service_token(request):
+        return True
+
     try:
-        allowed, user_id = check_user_auth(get_bearer_token(request))
+        allowed, _ = _check_admin_claims(get_token_claims(request))
     except Exception as e:
         sentry_sdk.capture_exception(e)
         raise credentials_exception
-    else:
-        if not allowed:
-            return ensure_authorization(get_bearer_token(request))
+
+    if allowed:
         return True
 
+    raise credentials_exception
+
 
 def ensure_websocket_authorization(token: Annotated[Optional[str], Query()]):
     credentials_exception = HTTPException(
@@ -81,75 +141,43 @@ def ensure_websocket_authorization(token: Annotated[Optional[str], Query()]):
     return True
 
 
-def check_jwt_auth(token: str | None) -> bool:
-    if not token:
+def _check_service_claims(claims: dict | None) -> bool:
+    if not claims or not claims.get("service_name"):
         return False
 
-    try:
-        token = get_bearer_token_content(token)
-        if not token or not token.get("service_name"):
-            raise JWTError()
-    except JWTError:
-        return False
-
-    return token.get("service_name") in allowed_services
-
-
-def get_bearer_token_content(token: str | None) -> dict | None:
-    if not token:
-        return None
-
-    try:
-        keys = EnvironmentHelper.get_auth_keys()
-        token = jwt.decode(token, keys.secret_key, algorithms=[ALGORITHM])
-    except JWTError:
-        return None
-
-    return token
-
-
-def get_jwt_token_user_id(token: str | None) -> int | None:
-    if not token:
-        return None
-
-    try:
-        keys = EnvironmentHelper.get_auth_keys()
-        token = jwt.decode(token, keys.secret_key, algorithms=[ALGORITHM])
-    except JWTError:
-        return None
-
-    return token.get("user_id")
+    return claims.get("service_name") in allowed_services
 
 
-def check_user_auth(token: str | None) -> (bool, int | None):
-    if not token:
-        return False, None
-
-    try:
-        keys = EnvironmentHelper.get_auth_keys()
-        token = jwt.decode(token, keys.secret_key, algorithms=[ALGORITHM])
-    except JWTError:
+def _check_admin_claims(claims: dict | None) -> tuple[bool, int | None]:
+    if not claims:
         return False, None
 
-    user_id: int | None = token.get("user_id")
+    user_id: int | None = claims.get("user_id")
     if not user_id:
         return False, None
 
-    token_type = token.get("type")
+    token_type = claims.get("type")
     if not token_type or token_type != "admin":
-        return False
+        return False, None
 
     try:
-        admin = postgres.users.get_user(user_id).admin
+        admin = get_postgres().users.get_user(user_id).admin
     except ItemNotFoundException:
-        return False
+        return False, None
     else:
         return admin, user_id
 
 
+def check_jwt_auth(token: str | None) -> bool:
+    return _check_service_claims(_decode(token))
+
+
+def check_user_auth(request: Request) -> tuple[bool, int | None]:
+    return _check_admin_claims(get_token_claims(request))
+
+
 def _create_access_token(to_encode: dict):
-    keys = EnvironmentHelper.get_auth_keys()
-    encoded_jwt = jwt.encode(to_encode, keys.secret_key, algorithm=ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, _get_keys().secret_key, algorithm=ALGORITHM)
     return encoded_jwt
 
 
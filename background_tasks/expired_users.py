@@ -5,9 +5,11 @@
 import sentry_sdk
 from fastapi import HTTPException
 from nng_sdk.logger import get_logger
-from nng_sdk.postgres.db_models.users import DbUser
-from nng_sdk.postgres.exceptions import NngPostgresException, ItemNotFoundException
+from nng_sdk.postgres.db_models.comments import DbComment
+from nng_sdk.postgres.db_models.users import DbUser, DbTrustInfo
+from nng_sdk.postgres.exceptions import NngPostgresException
 from nng_sdk.postgres.nng_postgres import NngPostgres
+from sqlalchemy import select, exists
 from sqlalchemy.exc import IntegrityError
 
 from utils.users_utils import create_default_user
@@ -25,49 +27,62 @@ def try_create_default_user(user_id: int, postgres: NngPostgres):
         logger.info(f"создал пользователя {user_id}")
 
 
+def get_active_users_ids(postgres: NngPostgres) -> set[int]:
+    with postgres.begin_session() as session:
+        return set(session.execute(select(DbComment.author_id).distinct()).scalars())
+
+
+def get_existing_users_ids(postgres: NngPostgres, users_ids: set[int]) -> set[int]:
+    with postgres.begin_session() as session:
+        return set(
+            session.execute(
+                select(DbUser.user_id).where(DbUser.user_id.in_(users_ids))
+            ).scalars()
+        )
+
+
 def expired_users_task(postgres: NngPostgres):
     month_ago = datetime.date.today() - timedelta(days=30)
 
     logger.info("получаю всех пользователей")
 
-    active_users_ids = list(
-        set([i.author_id for i in postgres.comments.get_all_comments()])
-    )
+    active_users_ids = get_active_users_ids(postgres)
 
     logger.info(f"всего активных пользователей: {len(active_users_ids)}")
 
-    for index, user_id in enumerate(active_users_ids):
-        logger.info(f"проверяю {user_id} ({index + 1}/{len(active_users_ids)})")
-        try:
-            postgres.users.get_user(user_id)
-        except ItemNotFoundException:
-            try_create_default_user(user_id, postgres)
+    missing_users_ids = active_users_ids - get_existing_users_ids(
+        postgres, active_users_ids
+    )
+
+    logger.info(f"отсутствуют в базе: {len(missing_users_ids)}")
+
+    for user_id in missing_users_ids:
+        try_create_default_user(user_id, postgres)
 
     with postgres.begin_session() as session:
+        # админы, активисты и те, у кого есть комментарии, отсеиваются в базе
         expired_db_users: List[DbUser] = (
-            session.query(DbUser).filter(DbUser.join_date <= month_ago).all()
+            session.query(DbUser)
+            .join(DbTrustInfo)
+            .filter(
+                DbUser.join_date <= month_ago,
+                DbUser.admin.isnot(True),
+                DbTrustInfo.activism.isnot(True),
+                ~exists().where(DbComment.author_id == DbUser.user_id),
+            )
+            .all()
         )
 
-        potential_expired_users = [
-            user
+        expired_users_ids: list[int] = [
+            user.user_id
             for user in expired_db_users
-            if not user.groups
-            and not user.violations
-            and not user.admin
-            and not user.trust_info.activism
+            if not user.groups and not user.violations
         ]
 
-    expired_users = []
-
-    for user in potential_expired_users:
-        if not postgres.comments.get_user_comments(user.user_id):
-            expired_users.append(user)
-
-    logger.info(f"на удаление: {len(expired_users)}")
+    logger.info(f"на удаление: {len(expired_users_ids)}")
 
-    for user in expired_users:
+    for user_id in expired_users_ids:
         try:
-            user_id: int = user.user_id
             postgres.users.delete_user(user_id)
         except (NngPostgresException, IntegrityError) as e:
             sentry_sdk.capture_exception(e)
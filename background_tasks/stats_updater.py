@@ -1,5 +1,6 @@
 import asyncio
 import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 from nng_sdk.logger import get_logger
 from nng_sdk.vk.actions import get_members, GroupDataResponse
@@ -10,23 +11,23 @@
 
 logger = get_logger()
 
+MEMBERS_FETCH_WORKERS = 16
+
 
 def has_stat_for_today(postgres: NngPostgres) -> bool:
-    all_stats = postgres.groups_stats.get_stats()
-    return any(stat for stat in all_stats if stat.date == datetime.date.today())
+    today = datetime.date.today()
+    return any(stat.date == today for stat in postgres.groups_stats.get_stats())
 
 
 def get_all_subscribers_count(postgres: NngPostgres) -> int:
     all_groups = [i.group_id for i in postgres.groups.get_all_groups()]
 
-    group_members: list[int] = []
+    group_members: set[int] = set()
 
-    for group in all_groups:
-        members: list[dict] = get_members(group)
-        legitimate_members = [i for i in members if "deactivated" not in i.keys()]
-        group_members.extend([i["id"] for i in legitimate_members])
+    with ThreadPoolExecutor(max_workers=MEMBERS_FETCH_WORKERS) as executor:
+        for members in executor.map(get_members, all_groups):
+            group_members.update(i["id"] for i in members if "deactivated" not in i)
 
-    group_members = list(set(group_members))
     return len(group_members)
 
 
@@ -42,36 +43,39 @@ async def wait_for_next_day():
     await asyncio.sleep(delta.total_seconds())
 
 
-def update_group_stats(postgres: NngPostgres):
+def upload_today_stats(postgres: NngPostgres):
+    groups: dict[int, GroupDataResponse] = GroupDataStorage().groups
+
+    logger.info(f"обновляю статистику за сегодня, всего {len(groups.keys())} групп")
+
+    stats: list[GroupStat] = [
+        GroupStat(
+            group_id=group_id,
+            members_count=group.members_count,
+            managers_count=group.managers_count,
+        )
+        for group_id, group in groups.items()
+    ]
+
+    logger.info(f"обновлена статистика в {len(stats)} группах")
+
+    total_managers = len(postgres.users.get_all_editors())
+
+    postgres.groups_stats.upload_statistics(
+        GroupStats(
+            date=datetime.date.today(),
+            stats=stats,
+            total_users=get_all_subscribers_count(postgres),
+            total_managers=total_managers,
+        )
+    )
+
+
+async def update_group_stats(postgres: NngPostgres):
     while True:
-        if has_stat_for_today(postgres):
+        if await asyncio.to_thread(has_stat_for_today, postgres):
             logger.info("статистика на сегодня уже присутсвует, жду день")
-            asyncio.run(wait_for_next_day())
+            await wait_for_next_day()
             continue
 
-        groups: dict[int, GroupDataResponse] = GroupDataStorage().groups
-        stats: list[GroupStat] = []
-
-        logger.info(f"обновляю статистику за сегодня, всего {len(groups.keys())} групп")
-
-        for group_id in groups.keys():
-            logger.info(f"обновлена статистика в группе {group_id}")
-            group: GroupDataResponse = groups[group_id]
-            stats.append(
-                GroupStat(
-                    group_id=group_id,
-                    members_count=group.members_count,
-                    managers_count=group.managers_count,
-                )
-            )
-
-        total_managers = len(postgres.users.get_all_editors())
-
-        postgres.groups_stats.upload_statistics(
-            GroupStats(
-                date=datetime.date.today(),
-                stats=stats,
-                total_users=get_all_subscribers_count(postgres),
-                total_managers=total_managers,
-            )
-        )
+        await asyncio.to_thread(upload_today_stats, postgres)
@@ -1,5 +1,7 @@
 import asyncio
 import datetime
+import functools
+from concurrent.futures import ThreadPoolExecutor
 
 import sentry_sdk
 from nng_sdk.logger import get_logger
@@ -8,12 +10,22 @@
 from nng_sdk.postgres.nng_postgres import NngPostgres
 from nng_sdk.pydantic_models.user import TrustInfo
 from nng_sdk.vk.vk_manager import VkManager
-from sqlalchemy import select
+from sqlalchemy import Column, select, update, bindparam, inspect
+from sqlalchemy.exc import SQLAlchemyError
 
 from services.trust_service import TrustService
 
 logger = get_logger()
 
+TRUST_UPDATE_CONCURRENCY = 16
+TRUST_UPDATE_BATCH_SIZE = 500
+
+# свой пул, чтобы расчет траста не занимал стандартный executor, через который
+# идут запросы к API
+trust_executor = ThreadPoolExecutor(
+    max_workers=TRUST_UPDATE_CONCURRENCY, thread_name_prefix="trust_updater"
+)
+
 
 def get_users_with_outdated_trust(postgres: NngPostgres) -> list[int]:
     try:
@@ -48,21 +60,143 @@ async def wait_for_next_update():
     await asyncio.sleep(wait_time.total_seconds())
 
 
-def update_all_trust_factors(vk: VkManager, postgres: NngPostgres, op: OpConnect):
-    trust_service = TrustService(postgres, vk, op)
+@functools.lru_cache(maxsize=1)
+def get_trust_info_columns() -> dict[str, Column]:
+    # поле TrustInfo -> колонка таблицы, имя атрибута модели может не совпадать
+    # с именем колонки
+    columns = {
+        attribute.key: attribute.columns[0]
+        for attribute in inspect(DbTrustInfo).column_attrs
+    }
+
+    missing = [field for field in TrustInfo.model_fields if field not in columns]
+    if missing:
+        raise ValueError(f"у полей {missing} нет колонок в таблице траста")
+
+    if "user_id" not in DbTrustInfo.__table__.c:
+        raise ValueError("в таблице траста нет колонки user_id")
+
+    return {field: columns[field] for field in TrustInfo.model_fields}
+
+
+def bulk_update_trust_info(postgres: NngPostgres, items: list[tuple[int, TrustInfo]]):
+    columns = get_trust_info_columns()
+    table = DbTrustInfo.__table__
+
+    # один UPDATE на всю пачку вместо запроса на каждого пользователя
+    statement = (
+        update(table)
+        .where(table.c.user_id == bindparam("b_user_id"))
+        .values(
+            {column.name: bindparam(f"b_{field}") for field, column in columns.items()}
+        )
+    )
+
+    rows = []
+    for user, trust_info in items:
+        dumped = trust_info.model_dump()
+        row = {f"b_{field}": dumped[field] for field in columns}
+        row["b_user_id"] = user
+        rows.append(row)
 
-    def iterate():
-        users: list[int] = get_users_with_outdated_trust(postgres)
-        logger.info(f"всего пользователей с устаревшим траст фактором: {len(users)}")
-        for user in users:
-            logger.info(
-                f"обновляю траст у {user} ({users.index(user) + 1}/{len(users)})"
+    with postgres.begin_session() as session:
+        session.connection().execute(statement, rows)
+        session.commit()
+
+
+def update_trust_info_one_by_one(
+    postgres: NngPostgres, items: list[tuple[int, TrustInfo]]
+) -> int:
+    updated = 0
+    for user, trust_info in items:
+        try:
+            postgres.users.update_user_trust_info(user, trust_info)
+        except Exception as e:
+            sentry_sdk.capture_exception(e)
+            logger.error(f"не удалось сохранить траст у {user}: {e}")
+            continue
+
+        updated += 1
+
+    return updated
+
+
+def try_bulk_update_trust_info(
+    postgres: NngPostgres, items: list[tuple[int, TrustInfo]]
+) -> int:
+    if not items:
+        return 0
+
+    try:
+        bulk_update_trust_info(postgres, items)
+    except SQLAlchemyError as e:
+        sentry_sdk.capture_exception(e)
+        logger.warning(
+            f"не удалось сохранить траст пачкой из {len(items)} пользователей, "
+            f"сохраняем по одному: {e}"
+        )
+        return update_trust_info_one_by_one(postgres, items)
+
+    return len(items)
+
+
+async def calculate_user_trust(
+    user: int,
+    trust_service: TrustService,
+    semaphore: asyncio.Semaphore,
+) -> tuple[int, TrustInfo] | None:
+    async with semaphore:
+        try:
+            new_trust: TrustInfo = await asyncio.get_running_loop().run_in_executor(
+                trust_executor, trust_service.calculate_trust, user
+            )
+        except Exception as e:
+            sentry_sdk.capture_exception(e)
+            logger.error(f"не удалось обновить траст у {user}: {e}")
+            return None
+
+    new_trust.last_updated = datetime.date.today()
+    return user, new_trust
+
+
+async def iterate(trust_service: TrustService, postgres: NngPostgres):
+    users: list[int] = await asyncio.to_thread(get_users_with_outdated_trust, postgres)
+    logger.info(f"всего пользователей с устаревшим траст фактором: {len(users)}")
+
+    semaphore = asyncio.Semaphore(TRUST_UPDATE_CONCURRENCY)
+    tasks = [calculate_user_trust(user, trust_service, semaphore) for user in users]
+
+    updated = 0
+    pending: list[tuple[int, TrustInfo]] = []
+
+    for task in asyncio.as_completed(tasks):
+        result = await task
+        if not result:
+            continue
+
+        pending.append(result)
+        if len(pending) >= TRUST_UPDATE_BATCH_SIZE:
+            updated += await asyncio.to_thread(
+                try_bulk_update_trust_info, postgres, pending
             )
+            pending = []
+
+    updated += await asyncio.to_thread(try_bulk_update_trust_info, postgres, pending)
+
+    logger.info(f"траст обновлен у {updated}/{len(users)} пользователей")
+
 
-            new_trust: TrustInfo = trust_service.calculate_trust(user)
-            new_trust.last_updated = datetime.date.today()
-            postgres.users.update_user_trust_info(user, new_trust)
+async def update_all_trust_factors(vk: VkManager, postgres: NngPostgres, op: OpConnect):
+    try:
+        get_trust_info_columns()
+    except ValueError as e:
+        # схема разошлась с моделью, пачками траст сохранять нельзя
+        sentry_sdk.capture_exception(e)
+        logger.error(f"обновление траста остановлено: {e}")
+        raise
+
+    trust_service = TrustService(postgres, vk, op)
 
     while True:
-        iterate()
-        asyncio.run(wait_for_next_update())
+        await iterate(trust_service, postgres)
+        await wait_for_next_update()
@@ -1,18 +1,48 @@
+import functools
+
 from nng_sdk.one_password.op_connect import OpConnect
 from nng_sdk.postgres.nng_postgres import NngPostgres
 from nng_sdk.vk.vk_manager import VkManager
 
+from services.ban_service import BanService
 from services.trust_service import TrustService
 
 
-def get_trust_service():
-    op = OpConnect()
+@functools.lru_cache(maxsize=1)
+def get_vk_manager() -> VkManager:
     vk = VkManager()
-    postgres = NngPostgres()
+    vk.auth_in_vk()
+    vk.auth_in_bot()
+    return vk
+
+
+@functools.lru_cache(maxsize=1)
+def get_op_connect() -> OpConnect:
+    return OpConnect()
+
+
+@functools.lru_cache(maxsize=1)
+def get_postgres() -> NngPostgres:
+    return NngPostgres()
+
+
+@functools.lru_cache(maxsize=1)
+def _get_trust_service() -> TrustService:
+    return TrustService(get_postgres(), get_vk_manager(), get_op_connect())
+
+
+def get_trust_service():
+    yield _get_trust_service()
+
+
+@functools.lru_cache(maxsize=1)
+def _get_ban_service() -> BanService:
+    return BanService(get_postgres(), get_vk_manager(), get_op_connect())
+
 
-    trust_service = TrustService(postgres, vk, op)
-    yield trust_service
+def get_ban_service():
+    yield _get_ban_service()
 
 
 def get_db():
-    yield NngPostgres()
+    yield get_postgres()
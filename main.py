@@ -1,7 +1,10 @@
 import asyncio
+from contextlib import asynccontextmanager
+
 import sentry_sdk
 
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from nng_sdk.logger import get_logger
 from nng_sdk.one_password.op_connect import OpConnect
 from nng_sdk.postgres.nng_postgres import NngPostgres
@@ -26,6 +29,7 @@
 from background_tasks.groups_updater import update_group_cache
 from background_tasks.stats_updater import update_group_stats
 from background_tasks.trust_updater import update_all_trust_factors
+from dependencies import get_vk_manager, get_op_connect
 from dev import DEVELOPMENT
 
 if DEVELOPMENT:
@@ -35,36 +39,36 @@
 class BackgroundRunner:
     back_logger = get_logger()
 
+    def __init__(self):
+        self.tasks: list[asyncio.Task] = []
+
     async def run(self):
         self.back_logger.info("запускаю бэкграунд таски...")
         postgres = await try_get_database_or_wait()
 
-        asyncio.get_event_loop().run_in_executor(
-            None, self.back_tasks_sequence, postgres, VkManager(), OpConnect()
+        self.tasks.append(
+            asyncio.create_task(
+                self.back_tasks_sequence(postgres, get_vk_manager(), get_op_connect())
+            )
         )
 
         self.back_logger.info("готово")
 
-    @staticmethod
-    def back_tasks_sequence(
-        postgres: NngPostgres, vk_manager: VkManager, op: OpConnect
+    async def back_tasks_sequence(
+        self, postgres: NngPostgres, vk_manager: VkManager, op: OpConnect
     ):
-        update_group_cache(postgres)
-        expired_users_task(postgres)
-
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        await asyncio.to_thread(update_group_cache, postgres)
+        await asyncio.to_thread(expired_users_task, postgres)
 
-        asyncio.get_event_loop().run_in_executor(None, update_group_stats, postgres)
-
-        asyncio.get_event_loop().run_in_executor(
-            None, update_all_trust_factors, vk_manager, postgres, op
+        self.tasks.append(asyncio.create_task(update_group_stats(postgres)))
+        self.tasks.append(
+            asyncio.create_task(update_all_trust_factors(vk_manager, postgres, op))
         )
 
         while True:
-            asyncio.run(asyncio.sleep(60 * 60 * 24))
-            update_group_cache(postgres)
-            expired_users_task(postgres)
+            await asyncio.sleep(60 * 60 * 24)
+            await asyncio.to_thread(update_group_cache, postgres)
+            await asyncio.to_thread(expired_users_task, postgres)
 
 
 async def try_get_database_or_wait(max_tries: int = 5) -> NngPostgres:
@@ -94,8 +98,12 @@ async def try_get_database_or_wait(max_tries: int = 5) -> NngPostgres:
 
 logger = get_logger()
 
-VkManager().auth_in_vk()
-VkManager().auth_in_bot()
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    get_vk_manager()
+    yield
+
 
 app = FastAPI(
     title="nng api",
@@ -104,6 +112,8 @@ async def try_get_database_or_wait(max_tries: int = 5) -> NngPostgres:
     docs_url=None,
     openapi_url=None,
     redoc_url=None,
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 if DEVELOPMENT:
@@ -137,4 +147,5 @@ async def try_get_database_or_wait(max_tries: int = 5) -> NngPostgres:
 app.include_router(routers.comments.router)
 
 
-asyncio.create_task(BackgroundRunner().run())
+background_runner = BackgroundRunner()
+asyncio.create_task(background_runner.run())
@@ -1,8 +1,8 @@
+import functools
 from typing import Optional
 
 from fastapi import APIRouter, HTTPException, Depends, Request
 from nng_sdk.one_password.models.vk_client import VkClient
-from nng_sdk.one_password.op_connect import OpConnect
 from nng_sdk.postgres.nng_postgres import NngPostgres
 from pydantic import BaseModel
 
@@ -12,10 +12,9 @@
     create_user_access_token,
     get_bearer_token,
     check_user_auth,
-    get_jwt_token_user_id,
     allowed_services,
 )
-from dependencies import get_db
+from dependencies import get_db, get_op_connect
 from utils.users_utils import authorize_user_by_code
 
 router = APIRouter()
@@ -50,9 +49,14 @@ def auth(credential_form: AuthForm):
     }
 
 
+@functools.cache
+def get_vk_client() -> VkClient:
+    return get_op_connect().get_vk_client()
+
+
 @router.post("/vk_auth", tags=["auth"])
 def vk_auth(code_form: VkCodeForm, postgres: NngPostgres = Depends(get_db)):
-    vk_client: VkClient = OpConnect().get_vk_client()
+    vk_client: VkClient = get_vk_client()
 
     token, user = authorize_user_by_code(
         vk_client, code_form.code, code_form.original_redirect_uri, postgres
@@ -80,8 +84,8 @@ def is_valid(request: Request):
             detail="Could not find token, you need to put it into Authorization header",
         )
 
-    if check_user_auth(token):
-        user_id: int = get_jwt_token_user_id(token)
+    allowed, user_id = check_user_auth(request)
+    if allowed:
         return WhoAmIResponse(is_valid=True, user_id=user_id)
 
     return WhoAmIResponse(is_valid=False)
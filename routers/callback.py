@@ -1,11 +1,11 @@
-from typing import Optional, Annotated
+import asyncio
+from typing import Optional, Annotated, Callable, Awaitable
 
 import nng_sdk.postgres.exceptions
 import sentry_sdk
 from fastapi import APIRouter, Depends
 from nng_sdk.logger import get_logger
 from nng_sdk.one_password.op_callback_group import OpCallbackGroup
-from nng_sdk.one_password.op_connect import OpConnect
 from nng_sdk.postgres.nng_postgres import NngPostgres
 from nng_sdk.pydantic_models.user import User
 from onepasswordconnectsdk.client import FailedToRetrieveItemException
@@ -15,9 +15,11 @@
 from starlette.websockets import WebSocket, WebSocketDisconnect
 
 from auth.actions import ensure_websocket_authorization
+from dependencies import get_db, get_op_connect
 from routers.editor import (
     safe_give_editor,
 )
+from utils.ttl_cache import TtlCache
 from utils.websocket_logger_manager import WebSocketLoggerManager
 
 router = APIRouter()
@@ -38,19 +40,33 @@ class GroupOfficersEdit(BaseModel):
 
 
 ws_manager = WebSocketLoggerManager()
-op = OpConnect()
+CALLBACK_GROUP_CACHE_TTL = 60 * 5
+callback_groups_cache = TtlCache(ttl=CALLBACK_GROUP_CACHE_TTL)
+
+
+def get_callback_group(group_id: int) -> OpCallbackGroup | None:
+    op_group: OpCallbackGroup | None = callback_groups_cache.get(group_id)
+    if op_group:
+        return op_group
+
+    op_group = get_op_connect().get_callback_group(group_id)
+    if op_group:
+        callback_groups_cache.set(group_id, op_group)
+
+    return op_group
 
 
 @router.post("/callback", tags=["callback"], response_class=PlainTextResponse)
 async def post(
     event: VkEvent,
     background_tasks: BackgroundTasks,
+    postgres: NngPostgres = Depends(get_db),
 ):
     logger = get_logger()
     op_group: OpCallbackGroup
 
     try:
-        op_group = op.get_callback_group(event.group_id)
+        op_group = get_callback_group(event.group_id)
         if not op_group:
             raise FailedToRetrieveItemException()
     except FailedToRetrieveItemException:
@@ -65,19 +81,37 @@ async def post(
         logger.info(f"сикрет {event.secret} неверный")
         return "ok"
 
-    if event.type == "confirmation":
-        return op_group.confirm
+    handler = CALLBACK_HANDLERS.get(event.type, handle_other_event)
+    return await handler(event, background_tasks, postgres, op_group)
 
-    if event.type == "group_join":
-        user_id: int = int(event.object["user_id"])
-        logger.info(f"{user_id} вступил в {event.group_id}, начинаю обработку")
-        background_tasks.add_task(safe_give_editor, user_id, event.group_id)
-        return "ok"
 
-    if event.type != "group_officers_edit":
-        await ws_manager.broadcast(event)
-        return "ok"
+async def handle_confirmation(
+    event: VkEvent,
+    background_tasks: BackgroundTasks,
+    postgres: NngPostgres,
+    op_group: OpCallbackGroup,
+) -> str:
+    return op_group.confirm
+
 
+async def handle_group_join(
+    event: VkEvent,
+    background_tasks: BackgroundTasks,
+    postgres: NngPostgres,
+    op_group: OpCallbackGroup,
+) -> str:
+    user_id: int = int(event.object["user_id"])
+    get_logger().info(f"{user_id} вступил в {event.group_id}, начинаю обработку")
+    background_tasks.add_task(safe_give_editor, user_id, event.group_id)
+    return "ok"
+
+
+async def handle_group_officers_edit(
+    event: VkEvent,
+    background_tasks: BackgroundTasks,
+    postgres: NngPostgres,
+    op_group: OpCallbackGroup,
+) -> str:
     if not event.object:
         return "ok"
 
@@ -89,11 +123,40 @@ async def post(
         sentry_sdk.capture_exception(e)
         return "ok"
 
-    postgres = NngPostgres()
+    background_tasks.add_task(apply_officer_edit, event, group_officers_edit, postgres)
+    return "ok"
+
+
+async def handle_other_event(
+    event: VkEvent,
+    background_tasks: BackgroundTasks,
+    postgres: NngPostgres,
+    op_group: OpCallbackGroup,
+) -> str:
+    await ws_manager.broadcast(event)
+    return "ok"
+
+
+CallbackHandler = Callable[
+    [VkEvent, BackgroundTasks, NngPostgres, OpCallbackGroup], Awaitable[str]
+]
+
+CALLBACK_HANDLERS: dict[str, CallbackHandler] = {
+    "confirmation": handle_confirmation,
+    "group_join": handle_group_join,
+    "group_officers_edit": handle_group_officers_edit,
+}
+
+
+async def apply_officer_edit(
+    event: VkEvent, group_officers_edit: GroupOfficersEdit, postgres: NngPostgres
+):
     try:
-        user: User = postgres.users.get_user(group_officers_edit.user_id)
+        user: User = await asyncio.to_thread(
+            postgres.users.get_user, group_officers_edit.user_id
+        )
     except nng_sdk.postgres.exceptions.ItemNotFoundException:
-        return "ok"
+        return
 
     if group_officers_edit.level_new == 0:
         user.remove_group(event.group_id)
@@ -101,13 +164,12 @@ async def post(
         user.add_group(event.group_id)
 
     try:
-        postgres.users.update_user(user)
+        await asyncio.to_thread(postgres.users.update_user, user)
     except Exception as e:
         sentry_sdk.capture_exception(e)
-        return "ok"
+        return
 
     await ws_manager.broadcast(event)
-    return "ok"
 
 
 async def try_close(socket: WebSocket):
@@ -122,7 +184,8 @@ async def try_close(socket: WebSocket):
 async def websocket_callback_logs(
     websocket: WebSocket, _: Annotated[bool, Depends(ensure_websocket_authorization)]
 ):
-    await ws_manager.connect(websocket)
+    if not await ws_manager.connect(websocket):
+        return
 
     while True:
         try:
@@ -4,10 +4,10 @@
 from nng_sdk.postgres.exceptions import ItemNotFoundException
 from nng_sdk.postgres.nng_postgres import NngPostgres
 from nng_sdk.pydantic_models.comment import Comment
-from nng_sdk.pydantic_models.user import User
 
 from auth.actions import ensure_user_authorization
 from dependencies import get_db
+from utils.users_utils import user_exists
 
 router = APIRouter()
 
@@ -32,10 +32,8 @@ def get_user_comments(
     _: Annotated[bool, Depends(ensure_user_authorization)],
     postgres: NngPostgres = Depends(get_db),
 ):
-    try:
-        user: User = postgres.users.get_user(user_id)
-    except ItemNotFoundException:
+    if not user_exists(user_id, postgres):
         raise HTTPException(status_code=404, detail="User not found")
 
-    all_comments = postgres.comments.get_user_comments(user.user_id)
+    all_comments = postgres.comments.get_user_comments(user_id)
     return all_comments or []
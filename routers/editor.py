@@ -1,18 +1,19 @@
-import asyncio
 import datetime
+import time
 from enum import IntEnum
 from typing import Optional, Annotated
 
 import sentry_sdk
 from fastapi import APIRouter, Depends
 from nng_sdk.logger import get_logger
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from starlette.websockets import WebSocket, WebSocketDisconnect
 
 from auth.actions import ensure_authorization, ensure_websocket_authorization
-from dependencies import get_db
+from dependencies import get_db, get_postgres
 from nng_sdk.postgres.exceptions import ItemNotFoundException
 from nng_sdk.postgres.nng_postgres import NngPostgres
+from nng_sdk.pydantic_models.editor_history import EditorHistory
 from nng_sdk.pydantic_models.user import User
 from nng_sdk.vk.actions import edit_manager, is_in_group, GroupDataResponse
 from storage.group_data_storage import GroupDataStorage
@@ -24,6 +25,8 @@
 
 ws_manager = WebSocketLoggerManager()
 
+COOLDOWN = datetime.timedelta(hours=4)  # между выдачами
+
 
 class CannotChooseGroup(Exception):
     pass
@@ -48,6 +51,8 @@ class EditorLogType(IntEnum):
 
 
 class EditorLog(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     user_id: int
     log_type: EditorLogType
     group_id: Optional[int] = None
@@ -60,48 +65,28 @@ class GiveEditorResponse(BaseModel):
 
 def choose_group(user: User) -> int:
     groups_data: dict[int, GroupDataResponse] = GroupDataStorage().groups
-    group_list: list[int] = list(groups_data.keys())
-
-    user_groups = user.groups or []
 
-    potential_groups = [
-        group
-        for group in group_list
-        if group not in user_groups  # группы где чел не редач
-    ]
+    user_groups = set(user.groups or [])
 
-    if not potential_groups:
+    try:
+        return min(
+            (
+                group
+                for group in groups_data
+                if group not in user_groups  # группы где чел не редач
+            ),
+            key=lambda group: groups_data[group].managers_count,  # меньше всего редачей
+        )
+    except ValueError:
         raise CannotChooseGroup()
 
-    potential_groups = sorted(
-        potential_groups,
-        key=lambda group: groups_data[group].managers_count,  # сортировка по редачам
-    )
-
-    return potential_groups[0]
 
-
-def user_on_cooldown(user_id: int, postgres: NngPostgres) -> bool:
-    history = postgres.editor_history.get_user_history(user_id)
+def user_on_cooldown(history: Optional[EditorHistory]) -> bool:
     if not history:
         return False
 
     now = datetime.datetime.now()
-    for index, item in enumerate(history.history):
-        logger.info(f"итем #{index + 1}/{len(history.history)} юзер {user_id}")
-        if not item.granted:
-            logger.info(f"не выдано в группе {item.group_id}, пропуск")
-            continue
-
-        delta = (now - item.date).total_seconds()
-
-        if delta < 60 * 60 * 4:
-            logger.info(f"{user_id} на кулдауне")
-            return True  # 4 часа между выдачами
-        else:
-            logger.info(f"мимо: delta ({delta}) < {60 * 60 * 4}")
-
-    return False
+    return any(item.granted and now - item.date < COOLDOWN for item in history.history)
 
 
 def safe_give_editor(user_id: int, group_id: int):
@@ -113,7 +98,7 @@ def safe_give_editor(user_id: int, group_id: int):
 
 
 def try_give_editor_and_update_history(user_id: int, group_id: int):
-    postgres = NngPostgres()
+    postgres = get_postgres()
     try:
         user: User = postgres.users.get_user(user_id)
     except ItemNotFoundException:
@@ -126,26 +111,22 @@ def try_give_editor_and_update_history(user_id: int, group_id: int):
         return
 
     history = postgres.editor_history.get_user_history(user_id)
-    if not history or not [
-        i for i in history.get_items_from_last_day() if not i.granted
-    ]:
+    if not history or not any(not i.granted for i in history.get_items_from_last_day()):
         return
 
-    if [i for i in history.history if i.wip]:
+    if any(i.wip for i in history.history):
         return
 
     postgres.editor_history.set_wip(user_id, group_id)
-    asyncio.run(asyncio.sleep(2))
+    time.sleep(2)
 
     if not is_in_group(user_id, group_id):
         postgres.editor_history.clear_wip(user_id)
-        asyncio.run(
-            ws_manager.broadcast(
-                EditorLog(
-                    user_id=user_id,
-                    log_type=EditorLogType.editor_fail_left_group,
-                    group_id=group_id,
-                )
+        ws_manager.publish(
+            EditorLog(
+                user_id=user_id,
+                log_type=EditorLogType.editor_fail_left_group,
+                group_id=group_id,
             )
         )
         return
@@ -153,21 +134,17 @@ def try_give_editor_and_update_history(user_id: int, group_id: int):
     try:
         edit_manager(group_id, user_id, "editor")
         postgres.editor_history.add_granted_item(user_id, group_id)
-        asyncio.run(
-            ws_manager.broadcast(
-                EditorLog(
-                    user_id=user_id,
-                    log_type=EditorLogType.editor_success,
-                    group_id=group_id,
-                )
+        ws_manager.publish(
+            EditorLog(
+                user_id=user_id,
+                log_type=EditorLogType.editor_success,
+                group_id=group_id,
             )
         )
     except Exception as e:
         sentry_sdk.capture_exception(e)
-        asyncio.run(
-            ws_manager.broadcast(
-                EditorLog(user_id=user_id, log_type=EditorLogType.editor_fail)
-            )
+        ws_manager.publish(
+            EditorLog(user_id=user_id, log_type=EditorLogType.editor_fail)
         )
 
         postgres.editor_history.add_non_granted_item(user_id, group_id)
@@ -185,7 +162,8 @@ async def try_close(socket: WebSocket):
 async def websocket_callback_logs(
     websocket: WebSocket, _: Annotated[bool, Depends(ensure_websocket_authorization)]
 ):
-    await ws_manager.connect(websocket)
+    if not await ws_manager.connect(websocket):
+        return
 
     while True:
         try:
@@ -232,23 +210,25 @@ def give_editor(
         fail.argument = "Ты достиг лимита групп 🤷‍♂️"
         return fail
 
-    if user_on_cooldown(user.user_id, postgres):
+    history = postgres.editor_history.get_user_history(user.user_id)
+
+    if user_on_cooldown(history):
         return GiveEditorResponse(status=OperationStatus.cooldown)
 
     if postgres.editor_history.is_wip(user.user_id):
         fail.argument = "Выдача уже производится, подожди, пожалуйста ⏳"
         return fail
 
-    history = postgres.editor_history.get_user_history(request.user_id)
-
     target_group: int = 0
 
-    non_granted_last_day = [
-        i for i in history.get_items_from_last_day() if not i.granted
-    ]
+    non_granted_last_day = (
+        next((i for i in history.get_items_from_last_day() if not i.granted), None)
+        if history
+        else None
+    )
 
     if non_granted_last_day:
-        target_group = non_granted_last_day[0].group_id
+        target_group = non_granted_last_day.group_id
 
     if target_group == 0:
         try:
@@ -1,17 +1,22 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 
 from nng_sdk.postgres.exceptions import ItemNotFoundException
 from nng_sdk.postgres.nng_postgres import NngPostgres
 from nng_sdk.pydantic_models.group import Group
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 
 from auth.actions import ensure_authorization
 from dependencies import get_db
+from utils.ttl_cache import TtlCache
 
 router = APIRouter()
 
+GROUPS_CACHE_TTL = 30
+groups_cache = TtlCache(ttl=GROUPS_CACHE_TTL, maxsize=1)
+groups_adapter = TypeAdapter(list[Group])
+
 
 class PhotoData(BaseModel):
     server: int
@@ -24,9 +29,22 @@ class UploadGroup(BaseModel):
     photo: PhotoData
 
 
+def get_all_groups_json(postgres: NngPostgres) -> bytes:
+    content: bytes | None = groups_cache.get("all")
+    if content is None:
+        content = groups_adapter.dump_json(
+            postgres.groups.get_all_groups(), by_alias=True
+        )
+        groups_cache.set("all", content)
+
+    return content
+
+
 @router.get("/groups", response_model=list[Group], tags=["groups", "public"])
 def get_groups(postgres: NngPostgres = Depends(get_db)):
-    return postgres.groups.get_all_groups()
+    return Response(
+        content=get_all_groups_json(postgres), media_type="application/json"
+    )
 
 
 @router.get("/groups/{group_id}", response_model=Group, tags=["groups"])
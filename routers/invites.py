@@ -11,6 +11,7 @@
 from dependencies import get_db
 from utils.invite_crypt import check_invite, generate_invite_for_user
 from utils.trust_restrictions import allowed_to_invite
+from utils.users_utils import set_invited_by
 
 
 class InviteForm(BaseModel):
@@ -81,14 +82,18 @@ def use_invite(
             response_type=UseInviteResponseType.invalid_or_banned_referral
         )
 
-    if not check_user(referral_id, postgres):
+    try:
+        referral: Optional[User] = postgres.users.get_user(referral_id)
+    except ItemNotFoundException:
+        referral = None
+
+    if not referral or referral.has_active_violation():
         return UseInviteResponse(
             response_type=UseInviteResponseType.invalid_or_banned_referral
         )
 
     try:
         user: User = postgres.users.get_user(form.user)
-        referral: User = postgres.users.get_user(referral_id)
     except ItemNotFoundException:
         return UseInviteResponse(response_type=UseInviteResponseType.invalid_user)
 
@@ -129,8 +134,7 @@ def use_invite(
 
     response.status_code = 200
 
-    user.invited_by = referral.user_id
-    postgres.users.update_user(user)
+    set_invited_by(user.user_id, referral.user_id, postgres)
 
     return UseInviteResponse(
         response_type=UseInviteResponseType.success,
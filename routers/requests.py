@@ -1,16 +1,16 @@
+import asyncio
 import datetime
+from itertools import islice
 from typing import Optional, Annotated
 
 import sentry_sdk
 from fastapi import APIRouter, HTTPException, Depends, Response, BackgroundTasks
 from nng_sdk.logger import get_logger
-from nng_sdk.one_password.op_connect import OpConnect
 from nng_sdk.postgres.exceptions import ItemNotFoundException
 from nng_sdk.postgres.nng_postgres import NngPostgres
 from nng_sdk.pydantic_models.request import Request, RequestType
 from nng_sdk.pydantic_models.user import User, Violation, ViolationType
-from nng_sdk.vk.vk_manager import VkManager
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from starlette.websockets import WebSocket, WebSocketDisconnect
 
 from auth.actions import (
@@ -18,9 +18,9 @@
     ensure_user_authorization,
     ensure_websocket_authorization,
 )
-from dependencies import get_db
+from dependencies import get_db, get_ban_service
 from services.ban_service import BanService
-from utils.users_utils import try_ban_user_as_teal
+from utils.users_utils import try_ban_user_as_teal, get_users_names
 from utils.websocket_logger_manager import (
     WebSocketLoggerManager,
 )
@@ -33,12 +33,30 @@
 ANOTHER_REQUEST_WAS_OPENED = "Ты уже подавал запрос на разблокировку"
 USER_NOT_FOUND = "Внутренняя ошибка"
 
+# (не первое нарушение, нарушению меньше года, токсичный) -> причина отказа
+AUTO_DENY_ANSWERS: dict[tuple[bool, bool, bool], str] = {
+    (not_first, unexpired, toxic): (
+        NOT_FIRST_VIOLATION
+        if not_first
+        else UNEXPIRED_VIOLATION if unexpired else TOO_TOXIC if toxic else ""
+    )
+    for not_first in (False, True)
+    for unexpired in (False, True)
+    for toxic in (False, True)
+}
+
 
 class RequestWebsocketLog(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     request_id: int
     send_to_user: int
 
 
+class RequestWithUser(Request):
+    user_name: Optional[str] = None
+
+
 class PutRequest(BaseModel):
     request_type: RequestType
     user_id: int
@@ -69,12 +87,18 @@ class PostRequest(BaseModel):
 socket_manager: WebSocketLoggerManager = WebSocketLoggerManager()
 
 
-@router.get("/requests/list", response_model=list[Request], tags=["requests"])
+@router.get("/requests/list", response_model=list[RequestWithUser], tags=["requests"])
 def get_requests(
     _: Annotated[bool, Depends(ensure_user_authorization)],
     postgres: NngPostgres = Depends(get_db),
 ):
-    return postgres.requests.get_all_unanswered_requests()
+    requests: list[Request] = postgres.requests.get_all_unanswered_requests() or []
+    names = get_users_names({i.user_id for i in requests}, postgres)
+
+    return [
+        RequestWithUser(**i.model_dump(), user_name=names.get(i.user_id))
+        for i in requests
+    ]
 
 
 @router.get("/requests/user/{user_id}", response_model=list[Request], tags=["requests"])
@@ -86,28 +110,28 @@ def get_user_requests(
     return postgres.requests.get_user_requests(user_id)
 
 
-def throw_for_request_duplicates(req: PutRequest, user: User, postgres: NngPostgres):
+def throw_for_request_duplicates(
+    req: PutRequest, user: User, postgres: NngPostgres, today: datetime.date
+):
     if req.request_type is not RequestType.unblock:
         return
 
     user_requests: list[Request] = postgres.requests.get_user_requests(user.user_id)
+    year_ago = today - datetime.timedelta(days=365)
+
+    if any(
+        request.answered
+        and request.request_type is RequestType.unblock
+        and not request.decision
+        and request.created_on > year_ago
+        for request in user_requests or []
+    ):
+        raise HTTPException(
+            status_code=400, detail="Another request has already been received"
+        )
+
 
-    if user_requests:
-        for request in user_requests:
-            if (
-                request.answered
-                and request.request_type is RequestType.unblock
-                and not request.decision
-                and (datetime.date.today() - request.created_on)
-                < datetime.timedelta(days=365)
-            ):
-                raise HTTPException(
-                    status_code=400, detail="Another request has already been received"
-                )
-    return
-
-
-def auto_deny_request(request: Request, user: User) -> Request:
+def auto_deny_request(request: Request, user: User, today: datetime.date) -> Request:
     if request.request_type is not RequestType.unblock:
         return request
 
@@ -118,30 +142,19 @@ def auto_deny_request(request: Request, user: User) -> Request:
     except RuntimeError:
         return request
 
-    is_first_violation = (
-        len([i for i in user.violations if i.type == ViolationType.banned]) <= 1
-    )
+    banned_violations = (i for i in user.violations if i.type == ViolationType.banned)
+    # достаточно найти второй бан, дальше не считаем
+    not_first_violation = next(islice(banned_violations, 1, None), None) is not None
 
-    more_than_year_ago: bool | None = (
-        True
-        if violation.date
-        and (datetime.date.today() - violation.date) > datetime.timedelta(days=365)
-        else False if violation.date else None
+    unexpired_violation = bool(violation.date) and (
+        today - violation.date <= datetime.timedelta(days=365)
     )
 
     is_toxic = user.trust_info.toxicity > 75
 
-    answer: str = (
-        NOT_FIRST_VIOLATION
-        if not is_first_violation
-        else (
-            UNEXPIRED_VIOLATION
-            if (more_than_year_ago == False)
-            else TOO_TOXIC if is_toxic else ""
-        )
-    )
+    answer = AUTO_DENY_ANSWERS[(not_first_violation, unexpired_violation, is_toxic)]
 
-    if not is_first_violation or (more_than_year_ago == False) or is_toxic:
+    if answer:
         request.answer = answer
         request.answered = True
         request.decision = False
@@ -156,20 +169,26 @@ async def open_request(
     _: Annotated[bool, Depends(ensure_authorization)],
     postgres: NngPostgres = Depends(get_db),
 ):
+    today = datetime.date.today()
+
     try:
-        user: User = postgres.users.get_user(request_data.user_id)
+        user: User = await asyncio.to_thread(
+            postgres.users.get_user, request_data.user_id
+        )
     except ItemNotFoundException:
         response.status_code = 404
         return PutRequestResponse(response=USER_NOT_FOUND, success=False)
 
     try:
-        throw_for_request_duplicates(request_data, user, postgres)
+        await asyncio.to_thread(
+            throw_for_request_duplicates, request_data, user, postgres, today
+        )
     except HTTPException:
         return PutRequestResponse(response=ANOTHER_REQUEST_WAS_OPENED, success=False)
 
     request = Request(
         request_type=request_data.request_type,
-        created_on=datetime.date.today(),
+        created_on=today,
         user_id=request_data.user_id,
         user_message=request_data.user_message,
         vk_comment=(
@@ -182,9 +201,11 @@ async def open_request(
         answered=False,
     )
 
-    request = auto_deny_request(request, user)
+    request = auto_deny_request(request, user, today)
 
-    new_request: Request = postgres.requests.upload_or_update_request(request)
+    new_request: Request = await asyncio.to_thread(
+        postgres.requests.upload_or_update_request, request
+    )
 
     if new_request.answered:
         await socket_manager.broadcast(
@@ -219,9 +240,12 @@ async def change_request_status(
     background_tasks: BackgroundTasks,
     _: Annotated[bool, Depends(ensure_user_authorization)],
     postgres: NngPostgres = Depends(get_db),
+    ban_service: BanService = Depends(get_ban_service),
 ):
     try:
-        request: Request = postgres.requests.get_request(request_id)
+        request: Request = await asyncio.to_thread(
+            postgres.requests.get_request, request_id
+        )
     except ItemNotFoundException:
         raise HTTPException(status_code=404, detail="Request not found")
 
@@ -233,14 +257,13 @@ async def change_request_status(
     request.decision = status.decision
     request.answered = status.answered
 
-    postgres.requests.upload_or_update_request(request)
+    await asyncio.to_thread(postgres.requests.upload_or_update_request, request)
 
     if (
         request.request_type is RequestType.unblock
         and request.answered
         and request.decision
     ):
-        ban_service = BanService(postgres, VkManager(), OpConnect())
         background_tasks.add_task(ban_service.amnesty_user, request.user_id)
 
     if (
@@ -251,7 +274,8 @@ async def change_request_status(
         and request.intruder
         and not original_answered
     ):
-        try_ban_user_as_teal(
+        await asyncio.to_thread(
+            try_ban_user_as_teal,
             request.intruder,
             request.vk_comment,
             request_id,
@@ -299,7 +323,7 @@ def change_intruder(
 
 async def try_close(socket: WebSocket):
     try:
-        await socket_manager.disconnect(socket)
+        socket_manager.disconnect(socket)
         await socket.close()
     except Exception as e:
         sentry_sdk.capture_exception(e)
@@ -309,7 +333,8 @@ async def try_close(socket: WebSocket):
 async def websocket_request_logs(
     websocket: WebSocket, _: Annotated[bool, Depends(ensure_websocket_authorization)]
 ):
-    await socket_manager.connect(websocket)
+    if not await socket_manager.connect(websocket):
+        return
 
     while True:
         try:
@@ -1,3 +1,4 @@
+import asyncio
 import datetime
 from enum import IntEnum
 from typing import Annotated, Optional
@@ -7,9 +8,7 @@
 from algoliasearch.search_client import SearchClient
 from algoliasearch.search_index import SearchIndex
 from fastapi import APIRouter, Depends, HTTPException
-from nng_sdk.logger import get_logger
 from nng_sdk.one_password.models.algolia_credentials import AlgoliaCredentials
-from nng_sdk.one_password.op_connect import OpConnect
 from nng_sdk.postgres.exceptions import ItemNotFoundException
 from nng_sdk.postgres.nng_postgres import NngPostgres
 from nng_sdk.pydantic_models.ticket import (
@@ -18,7 +17,7 @@
     TicketMessage,
     Ticket,
 )
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, TypeAdapter
 from starlette.websockets import WebSocket, WebSocketDisconnect
 
 from auth.actions import (
@@ -26,17 +25,23 @@
     ensure_websocket_authorization,
     ensure_user_authorization,
 )
-from dependencies import get_db
+from dependencies import get_db, get_op_connect
+from utils.singleflight import SingleFlight
+from utils.ttl_cache import TtlCache
 from utils.websocket_logger_manager import WebSocketLoggerManager
 
-logging = get_logger()
-
-algolia_credentials: AlgoliaCredentials = OpConnect().get_algolia_credentials()
+algolia_credentials: AlgoliaCredentials = get_op_connect().get_algolia_credentials()
 algolia: SearchClient = SearchClient.create(
     algolia_credentials.app_id, algolia_credentials.api_key
 )
 index: SearchIndex = algolia.init_index(algolia_credentials.index_name)
 
+ALGOLIA_CACHE_TTL = 60 * 5
+algolia_cache = TtlCache(ttl=ALGOLIA_CACHE_TTL, maxsize=2048)
+algolia_flights = SingleFlight()
+
+ticket_flights = SingleFlight()
+
 socket_manager: WebSocketLoggerManager = WebSocketLoggerManager()
 
 router = APIRouter()
@@ -64,6 +69,9 @@ class AlgoliaOutput(BaseModel):
     action: Optional[list] = None
 
 
+algolia_output_adapter = TypeAdapter(list[AlgoliaOutput])
+
+
 class TicketLogType(IntEnum):
     updated_status = 0
     admin_added_message = 1
@@ -71,6 +79,8 @@ class TicketLogType(IntEnum):
 
 
 class TicketWebsocketLog(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     log_type: TicketLogType
     ticket_id: int
 
@@ -81,13 +91,13 @@ class UploadMessage(BaseModel):
     attachments: Optional[list[str]] = None
 
     def to_ticket_message(
-        self, added: datetime.datetime = datetime.datetime.now()
+        self, added: Optional[datetime.datetime] = None
     ) -> TicketMessage:
         return TicketMessage(
             author_admin=self.author_admin,
             message_text=self.message_text,
             attachments=self.attachments or [],
-            added=added,
+            added=added or datetime.datetime.now(),
         )
 
 
@@ -109,8 +119,9 @@ def _get_topic(ticket: Ticket):
 
     @staticmethod
     def _needs_attention(ticket: Ticket):
-        ticket.sort_dialogs()
-        return not ticket.dialog[-1].author_admin
+        # нужно только последнее сообщение, сортировать весь диалог незачем
+        last_message = max(ticket.dialog, key=lambda message: message.added)
+        return not last_message.author_admin
 
     @staticmethod
     def from_ticket(ticket: Ticket):
@@ -126,26 +137,37 @@ def from_ticket(ticket: Ticket):
 
 
 @router.post("/tickets/algolia", response_model=list[AlgoliaOutput], tags=["tickets"])
-def algolia_search(
+async def algolia_search(
     query: PostAlgoliaQuery, _: Annotated[bool, Depends(ensure_authorization)]
 ):
+    key = query.query.strip().lower()
+
+    cached: list[AlgoliaOutput] | None = algolia_cache.get(key)
+    if cached is not None:
+        return cached
+
     try:
-        result = index.search(query.query)
+        result = await algolia_flights.do(
+            key, lambda: asyncio.to_thread(index.search, query.query)
+        )
     except algoliasearch.exceptions.AlgoliaException as e:
         sentry_sdk.capture_exception(e)
         return []
 
-    return [
-        AlgoliaOutput.model_validate(
+    output: list[AlgoliaOutput] = algolia_output_adapter.validate_python(
+        [
             {
                 "question": i["question"],
                 "answer": i["answer"],
                 "attachment": i.get("attachment"),
                 "action": i.get("action"),
             }
-        )
-        for i in result["hits"]
-    ]
+            for i in result["hits"]
+        ]
+    )
+
+    algolia_cache.set(key, output)
+    return output
 
 
 @router.post("/tickets/ticket/{ticket_id}/update/status", tags=["tickets"])
@@ -157,7 +179,7 @@ async def update_status(
     postgres: NngPostgres = Depends(get_db),
 ):
     try:
-        ticket = postgres.tickets.get_ticket(ticket_id)
+        ticket = await asyncio.to_thread(postgres.tickets.get_ticket, ticket_id)
     except ItemNotFoundException:
         raise HTTPException(status_code=404, detail="Ticket not found")
 
@@ -172,7 +194,7 @@ async def update_status(
     if status == TicketStatus.closed:
         ticket.closed = datetime.datetime.now()
 
-    postgres.tickets.upload_or_update_ticket(ticket)
+    await asyncio.to_thread(postgres.tickets.upload_or_update_ticket, ticket)
 
     if not silent:
         await socket_manager.broadcast(
@@ -193,20 +215,22 @@ async def add_message(
     postgres: NngPostgres = Depends(get_db),
 ):
     try:
-        ticket: Ticket = postgres.tickets.get_ticket(ticket_id)
+        ticket: Ticket = await asyncio.to_thread(postgres.tickets.get_ticket, ticket_id)
     except ItemNotFoundException:
         raise HTTPException(status_code=404, detail="Ticket not found")
 
     if ticket.is_closed:
         raise HTTPException(status_code=400, detail="Ticket is closed")
 
-    postgres.tickets.add_message(
-        ticket_id, message.to_ticket_message(added=datetime.datetime.now())
+    await asyncio.to_thread(
+        postgres.tickets.add_message,
+        ticket_id,
+        message.to_ticket_message(),
     )
 
     if message.author_admin and ticket.status != TicketStatus.in_review:
         ticket.status = TicketStatus.in_review
-        postgres.tickets.upload_or_update_ticket(ticket)
+        await asyncio.to_thread(postgres.tickets.upload_or_update_ticket, ticket)
 
     await socket_manager.broadcast(
         TicketWebsocketLog(
@@ -282,13 +306,15 @@ def get_all_opened_tickets(
 
 
 @router.get("/tickets/ticket/{ticket_id}", response_model=Ticket, tags=["tickets"])
-def get_ticket(
+async def get_ticket(
     ticket_id: int,
     _: Annotated[bool, Depends(ensure_user_authorization)],
     postgres: NngPostgres = Depends(get_db),
 ):
     try:
-        ticket = postgres.tickets.get_ticket(ticket_id)
+        ticket = await ticket_flights.do(
+            ticket_id, lambda: asyncio.to_thread(postgres.tickets.get_ticket, ticket_id)
+        )
     except ItemNotFoundException:
         raise HTTPException(status_code=404, detail="Ticket not found")
     else:
@@ -297,7 +323,7 @@ def get_ticket(
 
 async def try_close(socket: WebSocket):
     try:
-        await socket_manager.disconnect(socket)
+        socket_manager.disconnect(socket)
         await socket.close()
     except Exception as e:
         sentry_sdk.capture_exception(e)
@@ -307,7 +333,8 @@ async def try_close(socket: WebSocket):
 async def websocket_ticket_logs(
     websocket: WebSocket, _: Annotated[bool, Depends(ensure_websocket_authorization)]
 ):
-    await socket_manager.connect(websocket)
+    if not await socket_manager.connect(websocket):
+        return
 
     while True:
         try:
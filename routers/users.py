@@ -3,7 +3,6 @@
 
 import sentry_sdk
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
-from nng_sdk.one_password.op_connect import OpConnect
 from nng_sdk.postgres.exceptions import (
     ItemNotFoundException,
 )
@@ -19,7 +18,6 @@
     GroupDataResponse,
     edit_manager,
 )
-from nng_sdk.vk.vk_manager import VkManager
 from pydantic import BaseModel
 from vk_api import VkApiError
 
@@ -27,7 +25,7 @@
     ensure_authorization,
     ensure_user_authorization,
 )
-from dependencies import get_db, get_trust_service
+from dependencies import get_db, get_trust_service, get_ban_service
 from services.ban_service import BanService
 from services.trust_service import TrustService
 from utils.trust_restrictions import get_groups_restriction
@@ -297,6 +295,7 @@ def add_violation(
     immediate: bool = False,
     postgres: NngPostgres = Depends(get_db),
     trust_service: TrustService = Depends(get_trust_service),
+    ban_service: BanService = Depends(get_ban_service),
 ):
     try:
         db_user: User = postgres.users.get_user(user_id)
@@ -309,7 +308,6 @@ def add_violation(
         sentry_sdk.capture_exception(e)
         raise HTTPException(status_code=500, detail="Error while adding violation")
 
-    ban_service = BanService(postgres, VkManager(), OpConnect())
     if violation.type == ViolationType.banned and violation.active and immediate:
         background_tasks.add_task(ban_service.ban_user_in_groups, user_id)
     else:
@@ -324,6 +322,7 @@ def unban_user(
     background_tasks: BackgroundTasks,
     _: Annotated[bool, Depends(ensure_user_authorization)],
     postgres: NngPostgres = Depends(get_db),
+    ban_service: BanService = Depends(get_ban_service),
 ):
     try:
         db_user: User = postgres.users.get_user(user_id)
@@ -333,6 +332,5 @@ def unban_user(
     if not db_user.has_active_violation():
         raise HTTPException(status_code=400, detail="User is not banned")
 
-    ban_service = BanService(postgres, VkManager(), OpConnect())
     background_tasks.add_task(ban_service.amnesty_user, user_id)
     return {"detail": f"User {db_user.user_id} was unbanned"}
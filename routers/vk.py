@@ -15,7 +15,7 @@ class PostCallMethod(BaseModel):
 
 
 @router.post("/vk/call_method", tags=["vk"])
-async def call_vk_method(
+def call_vk_method(
     data: PostCallMethod,
     _: Annotated[bool, Depends(ensure_user_authorization)],
 ):
@@ -6,7 +6,7 @@
 import sentry_sdk
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
 from nng_sdk.logger import get_logger
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from starlette.websockets import WebSocketDisconnect, WebSocket
 
 from auth.actions import (
@@ -14,11 +14,12 @@
     ensure_user_authorization,
     ensure_websocket_authorization,
 )
-from dependencies import get_db
+from dependencies import get_db, get_postgres
 from nng_sdk.postgres.exceptions import ItemNotFoundException
 from nng_sdk.postgres.nng_postgres import NngPostgres
 from nng_sdk.pydantic_models.user import BanPriority, Violation, User, ViolationType
 from nng_sdk.pydantic_models.watchdog import Watchdog
+from utils.users_utils import user_exists
 from utils.websocket_logger_manager import WebSocketLoggerManager
 
 router = APIRouter()
@@ -31,6 +32,8 @@ class WatchdogWebsocketLogType(StrEnum):
 
 
 class WatchdogWebsocketLog(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     type: WatchdogWebsocketLogType
     priority: BanPriority
     group: int
@@ -149,7 +152,7 @@ def try_ban_and_notify_user(
     priority: BanPriority,
     group_id: int,
 ):
-    postgres = NngPostgres()
+    postgres = get_postgres()
 
     try:
         user = postgres.users.get_user(user_id)
@@ -264,9 +267,7 @@ async def notify_user(
     _: Annotated[bool, Depends(ensure_authorization)],
     postgres: NngPostgres = Depends(get_db),
 ):
-    try:
-        postgres.users.get_user(log.send_to_user)
-    except ItemNotFoundException:
+    if not await asyncio.to_thread(user_exists, log.send_to_user, postgres):
         raise HTTPException(status_code=400, detail="User not found")
 
     await watchdog_socket_manager.broadcast(log)
@@ -285,7 +286,8 @@ async def try_close(socket: WebSocket):
 async def websocket_watchdog_logs(
     websocket: WebSocket, _: Annotated[bool, Depends(ensure_websocket_authorization)]
 ):
-    await watchdog_socket_manager.connect(websocket)
+    if not await watchdog_socket_manager.connect(websocket):
+        return
 
     while True:
         try:
@@ -153,15 +153,12 @@ def get_trust_criteria(self, user: User) -> TrustInfo:
 
         has_active_violation = user.has_active_violation()
         has_violation = has_active_violation
-        had_violation = has_active_violation or (
-            not has_active_violation
-            and any([i for i in user.violations if i.type == ViolationType.banned])
+        had_violation = has_active_violation or any(
+            i.type == ViolationType.banned for i in user.violations
         )
 
         has_warning = user.has_warning()
-        had_warning = any(
-            [i for i in user.violations if i.type == ViolationType.warned]
-        )
+        had_warning = any(i.type == ViolationType.warned for i in user.violations)
 
         used_nng = self.has_month_old_comments(user_id)
 
@@ -174,8 +171,7 @@ def get_trust_criteria(self, user: User) -> TrustInfo:
         if not user_comments:
             toxicity = 0
         else:
-            toxic_scores = [i.toxicity * 100 for i in user_comments]
-            toxicity = (sum(toxic_scores) / len(toxic_scores)) / 100
+            toxicity = sum(i.toxicity for i in user_comments) / len(user_comments)
 
         try:
             registration_date = self.get_reg_date(user_id)
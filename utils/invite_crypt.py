@@ -1,13 +1,13 @@
 import hashlib
+import hmac
 
 import sentry_sdk
-from nng_sdk.one_password.op_connect import OpConnect
 
-op = OpConnect()
+from dependencies import get_op_connect
 
 
 def generate_invite_for_user(user_id: int):
-    salt = op.get_invites_salt()
+    salt = get_op_connect().get_invites_salt()
     result = hashlib.md5(f"{user_id}{salt}".encode()).hexdigest()
     return f"{user_id}:{result[:10]}"
 
@@ -21,8 +21,8 @@ def check_invite(invite: str) -> int | None:
         sentry_sdk.capture_exception(e)
         return None
     else:
-        salt = op.get_invites_salt()
+        salt = get_op_connect().get_invites_salt()
         result = hashlib.md5(f"{user_id}{salt}".encode()).hexdigest()
-        if result[:10] == hashed:
+        if hmac.compare_digest(result[:10].encode(), hashed.encode()):
             return user_id
         return None
@@ -0,0 +1,28 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    inflight: dict[Hashable, asyncio.Task]
+
+    def __init__(self):
+        self.inflight = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        task = self.inflight.get(key)
+        if not task:
+            # запрос выполняется в своей задаче, поэтому отмена одного из
+            # ожидающих не отменяет его у остальных
+            task = asyncio.create_task(func())
+            self.inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        if self.inflight.get(key) is task:
+            self.inflight.pop(key)
+
+        # чтобы asyncio не ругался на необработанное исключение без ожидающих
+        if not task.cancelled():
+            task.exception()
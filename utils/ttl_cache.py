@@ -0,0 +1,43 @@
+import threading
+import time
+from typing import Any, Hashable
+
+
+class TtlCache:
+    ttl: float
+    maxsize: int
+
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._items: dict[Hashable, tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any | None:
+        item = self._items.get(key)
+        if item is None:
+            return None
+
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            with self._lock:
+                self._items.pop(key, None)
+            return None
+
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            if key not in self._items and len(self._items) >= self.maxsize:
+                # вытесняем самый старый элемент, dict хранит порядок вставки
+                self._items.pop(next(iter(self._items)))
+
+            self._items[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
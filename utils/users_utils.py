@@ -4,6 +4,7 @@
 from fastapi import HTTPException
 from nng_sdk.logger import get_logger
 from nng_sdk.one_password.models.vk_client import VkClient
+from nng_sdk.postgres.db_models.users import DbUser
 from nng_sdk.postgres.exceptions import NngPostgresException, ItemNotFoundException
 from nng_sdk.postgres.nng_postgres import NngPostgres
 from nng_sdk.pydantic_models.user import (
@@ -15,6 +16,7 @@
 )
 from nng_sdk.vk.actions import get_user_data
 from nng_sdk.vk.vk_manager import VkManager
+from sqlalchemy import select, exists, update
 
 import routers.utils
 from services.trust_service import TrustService
@@ -32,6 +34,35 @@ def update_trust(user_id: int, postgres: NngPostgres, trust_service: TrustServic
     postgres.users.update_user_trust_info(user_id, new_trust)
 
 
+def user_exists(user_id: int, postgres: NngPostgres) -> bool:
+    with postgres.begin_session() as session:
+        return session.execute(
+            select(exists().where(DbUser.user_id == user_id))
+        ).scalar()
+
+
+def get_users_names(users_ids: set[int], postgres: NngPostgres) -> dict[int, str]:
+    if not users_ids:
+        return {}
+
+    with postgres.begin_session() as session:
+        return dict(
+            session.execute(
+                select(DbUser.user_id, DbUser.name).where(DbUser.user_id.in_(users_ids))
+            ).all()
+        )
+
+
+def set_invited_by(user_id: int, referral_id: int, postgres: NngPostgres):
+    with postgres.begin_session() as session:
+        session.execute(
+            update(DbUser)
+            .where(DbUser.user_id == user_id)
+            .values(invited_by=referral_id)
+        )
+        session.commit()
+
+
 def create_default_user(
     user_id: int, postgres: NngPostgres, username: str | None = None
 ):
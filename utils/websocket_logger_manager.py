@@ -1,24 +1,106 @@
+import asyncio
+
 from pydantic import BaseModel
 import sentry_sdk
-from starlette.websockets import WebSocket
+from starlette import status
+from starlette.websockets import WebSocket, WebSocketDisconnect
 
 
 class WebSocketLoggerManager:
-    active_connections: list[WebSocket]
+    queue_size: int = 1024
+    max_connections: int = 1000
+
+    active_connections: dict[WebSocket, asyncio.Queue]
+    writers: dict[WebSocket, asyncio.Task]
 
     def __init__(self):
-        self.active_connections = []
+        self.active_connections = {}
+        self.writers = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._closing: set[asyncio.Task] = set()
 
-    async def connect(self, socket: WebSocket):
+    async def connect(self, socket: WebSocket) -> bool:
         await socket.accept()
-        self.active_connections.append(socket)
+
+        if len(self.active_connections) >= self.max_connections:
+            await socket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+            return False
+
+        self._loop = asyncio.get_running_loop()
+
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self.active_connections[socket] = queue
+        self.writers[socket] = asyncio.create_task(self._write(socket, queue))
+        return True
 
     def disconnect(self, socket: WebSocket):
-        self.active_connections.remove(socket)
+        self.active_connections.pop(socket, None)
+        writer = self.writers.pop(socket, None)
+        if writer:
+            writer.cancel()
 
     async def broadcast(self, log: BaseModel):
-        for connection in self.active_connections:
+        self.publish(log)
+
+    def publish(self, log: BaseModel):
+        if not self.active_connections:
+            return
+
+        # сериализуем один раз на всех подписчиков
+        message = log.model_dump_json()
+
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        if running_loop is self._loop:
+            self._enqueue(message)
+            return
+
+        # вызвали из другого потока или из чужого event loop
+        try:
+            self._loop.call_soon_threadsafe(self._enqueue, message)
+        except RuntimeError as e:
+            sentry_sdk.capture_exception(e)
+
+    def _enqueue(self, message: str):
+        overflowed: list[WebSocket] = []
+
+        for socket, queue in self.active_connections.items():
+            if queue.full():
+                overflowed.append(socket)
+                continue
+
+            queue.put_nowait(message)
+
+        # клиент не успевает читать, отключаем его, чтобы не копить память
+        for socket in overflowed:
+            self.evict(socket)
+
+    def evict(self, socket: WebSocket):
+        self.disconnect(socket)
+
+        task = asyncio.create_task(self._close(socket))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    @staticmethod
+    async def _close(socket: WebSocket):
+        try:
+            await socket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        except Exception as e:
+            sentry_sdk.capture_exception(e)
+
+    async def _write(self, socket: WebSocket, queue: asyncio.Queue):
+        while True:
+            message = await queue.get()
             try:
-                await connection.send_json(log.dict())
+                await socket.send_text(message)
+            except WebSocketDisconnect:
+                self.disconnect(socket)
+                return
             except Exception as e:
                 sentry_sdk.capture_exception(e)
+                self.disconnect(socket)
+                return